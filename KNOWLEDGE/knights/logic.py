@@ -1,19 +1,82 @@
 import itertools
+import multiprocessing
+import weakref
+
+import sat
 
 
 class Sentence():
+    """Base class of immutable, hash-consed logical sentences.
+
+    Constructing a sentence structurally identical to a live one returns
+    the existing object, so equality is identity and each node computes
+    its hash and symbol set only once.
+    """
+
+    # Maps (class, constructor arguments) to the live sentence built from them
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, *args):
+        """Returns the unique sentence of this class with these arguments."""
+        key = (cls, args)
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            object.__setattr__(sentence, "args", args)
+            object.__setattr__(sentence, "hash_value", hash(key))
+            object.__setattr__(sentence, "symbol_cache", None)
+            Sentence.interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self.hash_value
+
+    def __reduce__(self):
+        return (type(self), self.args)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the sentence in a model that may omit symbols.
+
+        Returns True or False if every completion of the model agrees,
+        and None if the value depends on unassigned symbols.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the symbols as a frozenset, computed once per node."""
+        if getattr(self, "symbol_cache", None) is None:
+            children = [arg for arg in getattr(self, "args", ())
+                        if isinstance(arg, Sentence)]
+            object.__setattr__(self, "symbol_cache", frozenset().union(
+                *[child.symbol_set() for child in children]))
+        return self.symbol_cache
+
+    def compile(self, index, program):
+        """Appends instructions computing the sentence to program.
+
+        index maps symbol names to integers. Returns the position in
+        program of the instruction holding the sentence's value.
+        """
+        raise Exception("nothing to compile")
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +107,12 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        return cls.intern(name)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    @property
+    def name(self):
+        return self.args[0]
 
     def __repr__(self):
         return self.name
@@ -62,23 +123,29 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def symbol_set(self):
+        return frozenset([self.name])
+
+    def compile(self, index, program):
+        program.append(("symbol", index[self.name]))
+        return len(program) - 1
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(operand)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    @property
+    def operand(self):
+        return self.args[0]
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +153,28 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def compile(self, index, program):
+        operand = self.operand.compile(index, program)
+        program.append(("not", operand))
+        return len(program) - 1
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return cls.intern(*conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    @property
+    def conjuncts(self):
+        return self.args
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +183,44 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable; "
+                        "use And(*sentence.conjuncts, conjunct) instead")
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def compile(self, index, program):
+        conjuncts = [conjunct.compile(index, program)
+                     for conjunct in self.conjuncts]
+        program.append(("and", conjuncts))
+        return len(program) - 1
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.intern(*disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    @property
+    def disjuncts(self):
+        return self.args
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +229,42 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def compile(self, index, program):
+        disjuncts = [disjunct.compile(index, program)
+                     for disjunct in self.disjuncts]
+        program.append(("or", disjuncts))
+        return len(program) - 1
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.intern(antecedent, consequent)
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    @property
+    def antecedent(self):
+        return self.args[0]
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    @property
+    def consequent(self):
+        return self.args[1]
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +273,42 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def compile(self, index, program):
+        antecedent = self.antecedent.compile(index, program)
+        consequent = self.consequent.compile(index, program)
+        program.append(("implies", antecedent, consequent))
+        return len(program) - 1
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.intern(left, right)
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+    @property
+    def left(self):
+        return self.args[0]
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    @property
+    def right(self):
+        return self.args[1]
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,21 +319,48 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def compile(self, index, program):
+        left = self.left.compile(index, program)
+        right = self.right.compile(index, program)
+        program.append(("biconditional", left, right))
+        return len(program) - 1
+
 
+def model_check(knowledge, query, model=None):
+    """Checks if knowledge base entails query.
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    If model is given, only models extending its assignments are checked.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
+        # Stop early if every completion of the model decides entailment:
+        # a false knowledge base or a true query entail trivially, and a
+        # true knowledge base entails exactly when the query holds
+        kb = knowledge.evaluate_partial(model)
+        if kb is False:
+            return True
+        q = query.evaluate_partial(model)
+        if q is True:
+            return True
+        if kb is True and q is False:
+            return False
+
         # If model has an assignment for each symbol
         if not symbols:
 
@@ -257,7 +387,325 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    model = dict(model or {})
+    symbols = set.union(knowledge.symbols(), query.symbols()) - set(model)
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(knowledge, query, symbols, model)
+
+
+def parallel_model_check(knowledge, query, split_bits=None, workers=None):
+    """Checks if knowledge base entails query across worker processes.
+
+    The first split_bits symbols are fixed to each of their 2 ** split_bits
+    assignments, and each sub-space is model checked in a process pool.
+    All workers are stopped as soon as one finds a counter-model. By
+    default enough symbols are split to give each worker several tasks.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if split_bits is None:
+        split_bits = (8 * workers - 1).bit_length()
+    split = symbols[:split_bits]
+    tasks = (
+        (knowledge, query, dict(zip(split, values)))
+        for values in itertools.product([True, False], repeat=len(split))
+    )
+
+    # Leaving the block terminates any workers still running
+    with multiprocessing.Pool(workers) as pool:
+        for entailed in pool.imap_unordered(check_sub_space, tasks):
+            if not entailed:
+                return False
+    return True
+
+
+def check_sub_space(task):
+    """Model checks one sub-space for parallel_model_check."""
+    knowledge, query, model = task
+    return model_check(knowledge, query, model)
+
+
+def models(knowledge, symbols=None):
+    """Yields every model of the knowledge base, one dictionary each.
+
+    Models assign all symbols of the knowledge base plus any extra
+    symbols given. Symbols are assigned one at a time, and a branch is
+    abandoned as soon as the partial assignment falsifies the knowledge.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), set(symbols or ())))
+
+    def extend(model, remaining):
+        value = knowledge.evaluate_partial(model)
+        if value is False:
+            return
+        if not remaining:
+            yield dict(model)
+            return
+        p = remaining[0]
+        for truth in (True, False):
+            model[p] = truth
+            yield from extend(model, remaining[1:])
+        del model[p]
+
+    yield from extend({}, symbols)
+
+
+def consequences(knowledge, symbols):
+    """Finds which symbols the knowledge base forces true or false.
+
+    Returns (true, false), the sets of symbol names entailed to be true
+    and to be false, from a single pass over the models. Stops as soon as
+    every symbol has been seen both true and false. If the knowledge base
+    has no models, it entails everything and both sets are complete.
+    """
+    names = {str(symbol) for symbol in symbols}
+    true = set(names)
+    false = set(names)
+    for model in models(knowledge, names):
+        for name in names:
+            if model[name]:
+                false.discard(name)
+            else:
+                true.discard(name)
+        if not true and not false:
+            break
+    return true, false
+
+
+def compiled_model_check(knowledge, query, chunk_bits=20):
+    """Checks if knowledge base entails query by truth table.
+
+    Both sentences are compiled once into a flat program over integer
+    symbol indices. The program is then run on bit vectors holding up to
+    2 ** chunk_bits models at a time, so each operator handles a whole
+    chunk of models in one integer operation.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    program = []
+    knowledge_at = knowledge.compile(index, program)
+    query_at = query.compile(index, program)
+
+    # The lowest symbols vary within a chunk, the rest are fixed per chunk
+    inner = min(len(symbols), chunk_bits)
+    width = 1 << inner
+    mask = (1 << width) - 1
+    columns = [truth_column(i, width) for i in range(inner)]
+
+    for chunk in range(1 << (len(symbols) - inner)):
+        values = columns + [
+            mask if chunk >> (i - inner) & 1 else 0
+            for i in range(inner, len(symbols))
+        ]
+        results = run(program, values, mask)
+        if results[knowledge_at] & ~results[query_at] & mask:
+            return False
+    return True
+
+
+def truth_column(i, width):
+    """Returns the bit vector of symbol i's value in models 0..width - 1.
+
+    Bit m of the result is set when bit i of m is set.
+    """
+    period = 1 << (i + 1)
+    column = ((1 << (1 << i)) - 1) << (1 << i)
+    while period < width:
+        column |= column << period
+        period *= 2
+    return column
+
+
+def run(program, values, mask):
+    """Runs a compiled program on symbol bit vectors.
+
+    Returns the bit vector computed by every instruction.
+    """
+    results = []
+    for instruction in program:
+        op = instruction[0]
+        if op == "symbol":
+            results.append(values[instruction[1]])
+        elif op == "not":
+            results.append(~results[instruction[1]] & mask)
+        elif op == "and":
+            result = mask
+            for operand in instruction[1]:
+                result &= results[operand]
+            results.append(result)
+        elif op == "or":
+            result = 0
+            for operand in instruction[1]:
+                result |= results[operand]
+            results.append(result)
+        elif op == "implies":
+            results.append(
+                (~results[instruction[1]] | results[instruction[2]]) & mask)
+        elif op == "biconditional":
+            results.append(
+                ~(results[instruction[1]] ^ results[instruction[2]]) & mask)
+    return results
+
+
+def to_cnf(sentences):
+    """Converts sentences to an equisatisfiable set of clauses.
+
+    Uses the Tseitin encoding: every And, Or, Implication and
+    Biconditional gets a fresh variable defined by a few clauses, so
+    the result grows linearly with the sentences. Returns the clauses,
+    the number of variables, a dictionary mapping symbol names to their
+    variables and the literal standing for each sentence.
+    """
+    symbols = sorted(set.union(*[s.symbols() for s in sentences]))
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    program = []
+    positions = [sentence.compile(index, program) for sentence in sentences]
+
+    clauses = []
+    num_vars = len(symbols)
+    literals = []
+    for instruction in program:
+        op = instruction[0]
+        if op == "symbol":
+            literals.append(instruction[1] + 1)
+            continue
+        if op == "not":
+            literals.append(-literals[instruction[1]])
+            continue
+        if op in ("and", "or") and len(instruction[1]) == 1:
+            literals.append(literals[instruction[1][0]])
+            continue
+
+        num_vars += 1
+        v = num_vars
+        literals.append(v)
+        if op == "and":
+            operands = [literals[i] for i in instruction[1]]
+            clauses.extend([-v, a] for a in operands)
+            clauses.append([v] + [-a for a in operands])
+        elif op == "or":
+            operands = [literals[i] for i in instruction[1]]
+            clauses.extend([v, -a] for a in operands)
+            clauses.append([-v] + operands)
+        elif op == "implies":
+            a = literals[instruction[1]]
+            b = literals[instruction[2]]
+            clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        elif op == "biconditional":
+            a = literals[instruction[1]]
+            b = literals[instruction[2]]
+            clauses.extend([[-v, -a, b], [-v, a, -b],
+                            [v, a, b], [v, -a, -b]])
+
+    variables = {symbol: i + 1 for i, symbol in enumerate(symbols)}
+    return clauses, num_vars, variables, [literals[p] for p in positions]
+
+
+def sat_model_check(knowledge, query):
+    """Checks if knowledge base entails query using a SAT solver.
+
+    The knowledge base entails the query exactly when the knowledge
+    base together with the negated query has no model.
+    """
+    clauses, num_vars, _, (kb, q) = to_cnf([knowledge, query])
+    solver = sat.Solver(num_vars)
+    for clause in clauses + [[kb], [-q]]:
+        if not solver.add_clause(clause):
+            return True
+    return solver.solve() is None
+
+
+class KnowledgeBase():
+    """Knowledge base answering entailment queries incrementally.
+
+    Told sentences are Tseitin-encoded once into a persistent SAT solver,
+    reusing the encoding of any subsentence seen before, and each query
+    is a single solver call assuming the query is false. Answers are
+    cached with the version of the knowledge base they were computed
+    for; entailed queries stay entailed as knowledge only grows.
+    """
+
+    def __init__(self, *sentences):
+        self.solver = sat.Solver(0)
+        self.variables = {}
+        self.literals = {}
+        self.answers = {}
+        self.version = 0
+        self.sentences = []
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.version += 1
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.solver.add_clause([self.literal(conjunct)])
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        Sentence.validate(query)
+        cached = self.answers.get(query)
+        if cached is not None:
+            version, answer = cached
+            if answer or version == self.version:
+                return answer
+        answer = self.solver.solve([-self.literal(query)]) is None
+        self.answers[query] = (self.version, answer)
+        return answer
+
+    def knowledge(self):
+        """Returns everything told so far as a single sentence."""
+        return And(*self.sentences)
+
+    def literal(self, sentence):
+        """Returns the solver literal equivalent to sentence.
+
+        The clauses defining it are added the first time it is seen.
+        """
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        solver = self.solver
+        if isinstance(sentence, Symbol):
+            lit = solver.new_var()
+            self.variables[sentence.name] = lit
+        elif isinstance(sentence, Not):
+            lit = -self.literal(sentence.operand)
+        elif isinstance(sentence, (And, Or)):
+            operands = [self.literal(arg) for arg in sentence.args]
+            if len(operands) == 1:
+                lit = operands[0]
+            else:
+                lit = solver.new_var()
+                if isinstance(sentence, And):
+                    for a in operands:
+                        solver.add_clause([-lit, a])
+                    solver.add_clause([lit] + [-a for a in operands])
+                else:
+                    for a in operands:
+                        solver.add_clause([lit, -a])
+                    solver.add_clause([-lit] + operands)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            lit = solver.new_var()
+            for clause in [[-lit, -a, b], [lit, a], [lit, -b]]:
+                solver.add_clause(clause)
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            lit = solver.new_var()
+            for clause in [[-lit, -a, b], [-lit, a, -b],
+                           [lit, a, b], [lit, -a, -b]]:
+                solver.add_clause(clause)
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = lit
+        return lit
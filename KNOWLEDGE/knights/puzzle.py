@@ -108,8 +108,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            true, _ = consequences(knowledge, symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if symbol.name in true:
                     print(f"    {symbol}")
 if __name__ == "__main__":
     main()
\ No newline at end of file
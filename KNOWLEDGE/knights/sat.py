@@ -0,0 +1,249 @@
+import heapq
+
+
+class Solver():
+    """CDCL SAT solver over clauses of non-zero integer literals.
+
+    Variable v is true in literal v and false in literal -v, as in DIMACS.
+    Uses unit propagation with two watched literals per clause, first-UIP
+    clause learning with non-chronological backjumping, and VSIDS-style
+    variable activities with phase saving for decisions.
+    """
+
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+        self.clauses = []
+        self.watches = {lit: [] for v in range(1, num_vars + 1)
+                        for lit in (v, -v)}
+        # 1 for true, -1 for false, 0 for unassigned
+        self.values = [0] * (num_vars + 1)
+        self.levels = [0] * (num_vars + 1)
+        self.reasons = [None] * (num_vars + 1)
+        self.phases = [-1] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.increment = 1.0
+        self.order = [(0.0, v) for v in range(1, num_vars + 1)]
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.conflict = False
+
+    def new_var(self):
+        """Adds a fresh variable and returns it."""
+        self.num_vars += 1
+        var = self.num_vars
+        self.watches[var] = []
+        self.watches[-var] = []
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.phases.append(-1)
+        self.activity.append(0.0)
+        heapq.heappush(self.order, (0.0, var))
+        return var
+
+    def value(self, lit):
+        """Returns 1 if lit is true, -1 if false, 0 if unassigned."""
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, clause):
+        """Adds a clause at decision level 0.
+
+        Returns False if the clauses are now known to be unsatisfiable.
+        """
+        if self.conflict:
+            return False
+        clause = list(dict.fromkeys(clause))
+        if any(-lit in clause for lit in clause):
+            return True
+        clause = [lit for lit in clause if self.value(lit) != -1]
+        if any(self.value(lit) == 1 for lit in clause):
+            return True
+        if not clause:
+            self.conflict = True
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.conflict = self.propagate() is not None
+        else:
+            self.attach(clause)
+        return not self.conflict
+
+    def attach(self, clause):
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.values[var] = 1 if lit > 0 else -1
+        self.levels[var] = len(self.trail_limits)
+        self.reasons[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """Propagates assignments on the trail.
+
+        Returns the index of a conflicting clause, or None.
+        """
+        while self.head < len(self.trail):
+            false_lit = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false_lit]
+            self.watches[false_lit] = kept = []
+            for n, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    kept.append(index)
+                    continue
+
+                # Look for a new literal to watch instead of false_lit
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) == -1:
+                        kept.extend(watching[n + 1:])
+                        return index
+                    self.enqueue(clause[0], index)
+        return None
+
+    def analyze(self, conflict):
+        """Derives a first-UIP clause from a conflict.
+
+        Returns the learnt clause, with the asserting literal first and
+        a literal from the backjump level second, and that level.
+        """
+        level = len(self.trail_limits)
+        learnt = [None]
+        seen = set()
+        pending = 0
+        lit = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if var not in seen and self.levels[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.levels[var] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+
+            # Walk back to the most recent literal involved in the conflict
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            lit = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(lit)]]
+
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)),
+                      key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, self.num_vars + 1)
+                          if self.values[v] == 0]
+            heapq.heapify(self.order)
+        elif self.values[var] == 0:
+            heapq.heappush(self.order, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        """Undoes every assignment made above the given decision level."""
+        if len(self.trail_limits) <= level:
+            return
+        limit = self.trail_limits[level]
+        for lit in self.trail[limit:]:
+            var = abs(lit)
+            self.phases[var] = self.values[var]
+            self.values[var] = 0
+            self.reasons[var] = None
+            heapq.heappush(self.order, (-self.activity[var], var))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.order:
+            _, var = heapq.heappop(self.order)
+            if self.values[var] == 0:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """Searches for a satisfying assignment.
+
+        Assumptions are literals taken as true for this call only.
+        Returns a list of values indexed by variable (True or False),
+        or None if the clauses are unsatisfiable under the assumptions.
+        """
+        if self.conflict:
+            return None
+        self.backtrack(0)
+        self.head = 0
+        if self.propagate() is not None:
+            self.conflict = True
+            return None
+        self.order = [(-self.activity[v], v)
+                      for v in range(1, self.num_vars + 1)
+                      if self.values[v] == 0]
+        heapq.heapify(self.order)
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_limits:
+                    self.conflict = True
+                    return None
+                learnt, level = self.analyze(conflict)
+                # Assumptions undone here are made again by the loop below
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt))
+                self.increment /= 0.95
+                continue
+
+            # Assume the next assumption, or decide a fresh variable
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                lit = assumptions[level]
+                if self.value(lit) == -1:
+                    self.backtrack(0)
+                    return None
+                self.trail_limits.append(len(self.trail))
+                if self.value(lit) == 0:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.decide()
+            if var is None:
+                model = [None] + [value == 1 for value in self.values[1:]]
+                self.backtrack(0)
+                return model
+            self.trail_limits.append(len(self.trail))
+            self.enqueue(var * self.phases[var], None)
@@ -1,5 +1,6 @@
 import itertools
 import random
+from collections import deque
 
 
 class Minesweeper():
@@ -134,6 +135,68 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Minesweeper sentence whose cells are the set bits of an integer mask,
+    where cell (i, j) is bit i * width + j for the board's width.
+    Subsets, differences and equality of cells are single integer
+    operations, and the mask is the key for finding duplicates.
+    """
+
+    __slots__ = ("mask", "count")
+
+    def __init__(self, mask, count):
+        self.mask = mask
+        self.count = count
+
+    def __str__(self):
+        return f"{self.mask:b} = {self.count}"
+
+    def known_mines(self):
+        """
+        Returns the mask of the cells known to be mines.
+        """
+        if self.count == bin(self.mask).count("1"):
+            return self.mask
+        return 0
+
+    def known_safes(self):
+        """
+        Returns the mask of the cells known to be safe.
+        """
+        if self.count == 0:
+            return self.mask
+        return 0
+
+    def mark_mine(self, bit):
+        if self.mask & bit:
+            self.mask &= ~bit
+            self.count -= 1
+
+    def mark_safe(self, bit):
+        self.mask &= ~bit
+
+    def issubset(self, other):
+        return self.mask & ~other.mask == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence over the cells of self not in other,
+        given that other is a subset of self.
+        """
+        return BitSentence(self.mask & ~other.mask, self.count - other.count)
+
+
+def bits(mask):
+    """
+    Yields the index of every set bit of mask.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
@@ -152,8 +215,20 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Bit sentences about the game known to be true, by mask
+        self.knowledge = {}
+
+        # Maps each bit index to the sentences containing it
+        self.index = {}
+
+        # Sentences added and not yet inferred from
+        self.pending = deque()
+
+    def cells(self, mask):
+        """
+        Returns the (i, j) cells of a mask.
+        """
+        return [divmod(n, self.width) for n in bits(mask)]
 
     def mark_mine(self, cell):
         """
@@ -161,8 +236,7 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.remove_cell(cell, True)
 
     def mark_safe(self, cell):
         """
@@ -170,8 +244,27 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.remove_cell(cell, False)
+
+    def remove_cell(self, cell, mine):
+        """
+        Removes a known cell from every sentence containing it, and
+        queues the changed sentences or drops them if now duplicates.
+        """
+        n = cell[0] * self.width + cell[1]
+        bit = 1 << n
+        for sentence in self.index.pop(n, ()):
+            del self.knowledge[sentence.mask]
+            if mine:
+                sentence.mark_mine(bit)
+            else:
+                sentence.mark_safe(bit)
+            if sentence.mask in self.knowledge:
+                for n in bits(sentence.mask):
+                    self.index[n].discard(sentence)
+            elif sentence.mask:
+                self.knowledge[sentence.mask] = sentence
+                self.pending.append(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -179,64 +272,87 @@ class MinesweeperAI():
         safe cell, how many neighboring cells have mines in them.
 
         This function should:
-            1) mark the cell as a move that has been made DONE
-            2) mark the cell as safe DONE
+            1) mark the cell as a move that has been made
+            2) mark the cell as safe
             3) add a new sentence to the AI's knowledge base
-               based on the value of `cell` and `count` DONE
-            4) mark any additional cells as safe or as mines 
-               if it can be concluded based on the AI's knowledge base DONE
+               based on the value of `cell` and `count`
+            4) mark any additional cells as safe or as mines
+               if it can be concluded based on the AI's knowledge base
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
         # Mark the cell as a move that has been made
         self.moves_made.add(cell)
 
-        # Mark the cell as safe 
+        # Mark the cell as safe
         self.mark_safe(cell)
-        
-        # Add a new sentence to the AI's knowledge base based on the value of `cell` and `count`
-        neighbors = set()
-        i = cell[0]
-        j = cell[1]
-        c = 0
-        # Creating a set() of cell neighbors to the one clicked
-        for x in range(max(0, i-1), min(self.width, i+2)):
-            for y in range(max(0, j-1), min(self.width, j+2)):
-                if (x,y) not in self.moves_made and (x,y) not in self.mines:
-                    c+=1
-                    neighbors.add((x,y))
-                    print(neighbors)
-                elif (x,y) in self.mines:
-                    count -= 1
-        self.knowledge.append(Sentence(neighbors, count))
 
-        print(c)
-        print(f"NUMBER OF SENTENCES: {len(self.knowledge)}")
+        # Add a sentence over the neighbors not yet known to be safe or mines
+        neighbors = 0
+        i, j = cell
+        for x in range(max(0, i - 1), min(self.height, i + 2)):
+            for y in range(max(0, j - 1), min(self.width, j + 2)):
+                if (x, y) in self.mines:
+                    count -= 1
+                elif (x, y) not in self.safes:
+                    neighbors |= 1 << (x * self.width + y)
+        self.add_sentence(BitSentence(neighbors, count))
 
-        # Mark any additional cells as safe or as mines 
-        #      if it can be concluded based on the AI's knowledge base
-        for sentence in self.knowledge:
-            # If the cells are known mines mark all as mine
-            if sentence.known_mines():
-                for mine in sentence.known_mines().copy():
-                    self.mark_mine(mine)
+        # Draw conclusions until no sentence changes
+        self.infer()
 
-            # If the cells are known safes mark all as safe
-            if sentence.known_safes():
-                for safe_cell in sentence.known_safes().copy():
-                    self.mark_safe(safe_cell)       
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and queues it for inference,
+        unless it is empty or its cells are already known.
+        """
+        mask = sentence.mask
+        if not mask or mask in self.knowledge:
+            return
+        self.knowledge[mask] = sentence
+        for n in bits(mask):
+            self.index.setdefault(n, set()).add(sentence)
+        self.pending.append(sentence)
+
+    def related(self, sentence):
+        """
+        Returns the other known sentences sharing a cell with a sentence.
+        """
+        related = set()
+        for n in bits(sentence.mask):
+            related |= self.index[n]
+        related.discard(sentence)
+        return related
 
-        # Add any new sentences to the AI's knowledge base if they can be inferred from existing knowledge
-        for sentence1 in self.knowledge:
-            for sentence2 in self.knowledge:
-                if sentence1 == sentence2:
-                    continue
-                elif sentence1.cells.issubset(sentence2.cells):
-                    new_sentence = Sentence(
-                        sentence2.cells - sentence1.cells,
-                        sentence2.count - sentence1.count)
-                    if new_sentence not in self.knowledge:
-                        self.knowledge.append(new_sentence)
+    def infer(self):
+        """
+        Processes queued sentences until none remain. Each one is
+        resolved if all its cells are mines or all safe, and otherwise
+        compared with the sentences sharing its cells to add the
+        difference of any subset.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+            # Skip sentences emptied or dropped since they were queued
+            if self.knowledge.get(sentence.mask) is not sentence:
+                continue
+
+            mines = sentence.known_mines()
+            if mines:
+                for mine in self.cells(mines):
+                    self.mark_mine(mine)
+                continue
+            safes = sentence.known_safes()
+            if safes:
+                for safe_cell in self.cells(safes):
+                    self.mark_safe(safe_cell)
+                continue
+
+            for other in self.related(sentence):
+                if sentence.issubset(other):
+                    self.add_sentence(other.difference(sentence))
+                elif other.issubset(sentence):
+                    self.add_sentence(sentence.difference(other))
 
     def make_safe_move(self):
         """
@@ -264,7 +380,7 @@ class MinesweeperAI():
             return None
 
         while True:
-            i = random.randint(0, self.width - 1)
-            j = random.randint(0, self.height - 1)
+            i = random.randint(0, self.height - 1)
+            j = random.randint(0, self.width - 1)
             if (i,j) not in self.moves_made and (i,j) not in self.mines:
                 return (i,j)
\ No newline at end of file
@@ -0,0 +1,353 @@
+import argparse
+import functools
+import json
+import math
+import multiprocessing
+import sys
+from collections import Counter, defaultdict
+
+import degrees
+import snapshot
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+
+# NameIndex over degrees.names, built by setup() or else
+# on the first unknown name
+name_index = None
+
+# Number of queries a source needs before run() answers them from one
+# ShortestPathTree instead of one bidirectional search each: the tree
+# usually ends up walking most of the source's component
+TREE_QUERIES = 2000
+
+
+class ShortestPathTree():
+    """
+    Breadth-first search tree rooted at a source person. Layers are
+    expanded lazily, only as far as needed to reach requested targets,
+    so one tree answers every query that shares its source. On the
+    compact graph the tree holds graph indices rather than ids.
+    """
+
+    def __init__(self, source):
+        self.graph = degrees.graph
+        if self.graph is not None:
+            source = self.graph.person_index[source]
+        # Maps each reached person to (movie, parent)
+        self.parents = {source: None}
+        self.seen_movies = set()
+        self.layer = [source]
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        if self.graph is not None:
+            target = self.graph.person_index[target]
+        while target not in self.parents and self.layer:
+            self.expand()
+        if target not in self.parents:
+            return None
+
+        journey = []
+        person = target
+        while self.parents[person] is not None:
+            movie, parent = self.parents[person]
+            journey.append((movie, person))
+            person = parent
+        journey.reverse()
+        if self.graph is not None:
+            journey = [(self.graph.movie_ids[movie],
+                        self.graph.person_ids[person])
+                       for movie, person in journey]
+        return journey
+
+    def expand(self):
+        """
+        Expands the current BFS layer by one step,
+        visiting each movie once.
+        """
+        if self.graph is not None:
+            self.layer, _ = self.graph.expand_layer(
+                self.layer, self.parents, self.seen_movies, {})
+            return
+
+        next_layer = []
+        for person_id in self.layer:
+            for movie_id in degrees.people[person_id]["movies"]:
+                if movie_id in self.seen_movies:
+                    continue
+                self.seen_movies.add(movie_id)
+                for star_id in degrees.movies[movie_id]["stars"]:
+                    if star_id not in self.parents:
+                        self.parents[star_id] = (movie_id, person_id)
+                        next_layer.append(star_id)
+        self.layer = next_layer
+
+
+def resolve(name):
+    """
+    Returns the person_id for a name or an IMDB id without prompting.
+    Raises LookupError if the name is unknown or ambiguous.
+    """
+    global name_index
+
+    if name in degrees.people:
+        return name
+    person_ids = degrees.names.get(name.lower(), set())
+    if len(person_ids) == 0:
+        if name_index is None:
+            name_index = NameIndex(degrees.names)
+        suggestions = sorted({
+            degrees.people[person_id]["name"]
+            for _, person_id in name_index.search(name, limit=5)
+        })
+        if suggestions:
+            raise LookupError(f"person not found: {name} "
+                              f"(did you mean: {', '.join(suggestions)})")
+        raise LookupError(f"person not found: {name}")
+    elif len(person_ids) > 1:
+        raise LookupError(
+            f"ambiguous name: {name} ({', '.join(sorted(person_ids))})")
+    return next(iter(person_ids))
+
+
+def read_queries(lines):
+    """
+    Parses tab-separated "source<TAB>target" lines, skipping blank ones.
+    """
+    queries = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.strip():
+            source, _, target = line.partition("\t")
+            queries.append((source.strip(), target.strip()))
+    return queries
+
+
+def answer(source_name, target_name, path):
+    """
+    Returns the JSON-serializable result of one query.
+    """
+    if path is None:
+        return {"source": source_name, "target": target_name,
+                "degrees": None, "path": None}
+    return {
+        "source": source_name,
+        "target": target_name,
+        "degrees": len(path),
+        "path": [
+            {"movie_id": movie_id,
+             "movie": degrees.movies[movie_id]["title"],
+             "person_id": person_id,
+             "person": degrees.people[person_id]["name"]}
+            for movie_id, person_id in path
+        ]
+    }
+
+
+def estimate(source_name, target_name, source, target):
+    """
+    Returns the landmark bounds on the degrees between two people.
+    """
+    lower, upper = degrees.landmarks.bounds(source, target)
+    return {
+        "source": source_name,
+        "target": target_name,
+        "lower": None if lower == math.inf else lower,
+        "upper": None if upper == math.inf else upper
+    }
+
+
+def run(queries, estimate_only=False):
+    """
+    Answers (source_name, target_name) queries in order, yielding one
+    result dictionary per query. Sources that appear in at least
+    TREE_QUERIES queries share a single ShortestPathTree, which is
+    dropped after its last use; other queries run their own search.
+    Targets the landmark index proves unreachable are answered at once.
+
+    With estimate_only=True, results hold the landmark index's lower and
+    upper bounds on the degrees instead of a path.
+    """
+    resolved = []
+    for source_name, target_name in queries:
+        try:
+            resolved.append((resolve(source_name), resolve(target_name)))
+        except LookupError as e:
+            resolved.append(e)
+
+    remaining = Counter(
+        pair[0] for pair in resolved if not isinstance(pair, LookupError))
+    trees = {}
+
+    for (source_name, target_name), pair in zip(queries, resolved):
+        if isinstance(pair, LookupError):
+            yield {"source": source_name, "target": target_name,
+                   "error": str(pair)}
+            continue
+
+        source, target = pair
+        if estimate_only:
+            yield estimate(source_name, target_name, source, target)
+            continue
+        if (degrees.landmarks is not None
+                and degrees.landmarks.bounds(source, target)[0] == math.inf):
+            path = None
+        elif source in trees or remaining[source] >= TREE_QUERIES:
+            tree = trees.setdefault(source, ShortestPathTree(source))
+            path = tree.path_to(target)
+        elif degrees.landmarks is not None:
+            path = degrees.landmarks.shortest_path(source, target)
+        else:
+            path = degrees.bidirectional_shortest_path(source, target)
+
+        remaining[source] -= 1
+        if remaining[source] == 0:
+            trees.pop(source, None)
+        yield answer(source_name, target_name, path)
+
+
+def answer_group(group, estimate_only=False):
+    """
+    Answers a list of (index, source_name, target_name) queries that
+    share a source. Runs in a worker process and returns (index, result)
+    pairs.
+    """
+    indices = [index for index, _, _ in group]
+    queries = [(source, target) for _, source, target in group]
+    return list(zip(indices, run(queries, estimate_only)))
+
+
+def setup(directory, compact=False, cache=False, landmarks=None,
+          delta=None, save=True):
+    """
+    Loads the data, applies the delta directory if given, loads or
+    builds the landmark index at the landmarks path if given and builds
+    the name index, so forked workers share it. With save=False no
+    snapshot or landmark file is written.
+    """
+    global name_index
+
+    degrees.load_data(directory, compact, cache)
+
+    # An index of the data before the delta is brought up to date below
+    if landmarks:
+        degrees.landmarks = LandmarkIndex.load(landmarks)
+
+    if delta:
+        changed = degrees.load_delta(delta)
+        if cache and save:
+            snapshot.save(directory, degrees.names, degrees.people,
+                          degrees.movies, degrees.graph,
+                          degrees.data_source["deltas"])
+        if degrees.landmarks is not None:
+            degrees.landmarks.update(changed)
+            if save:
+                degrees.landmarks.save(landmarks)
+
+    if landmarks and degrees.landmarks is None:
+        # The file may already match the data with the delta applied
+        degrees.landmarks = LandmarkIndex.load(landmarks)
+        if degrees.landmarks is None:
+            degrees.landmarks = LandmarkIndex.build()
+            if save:
+                degrees.landmarks.save(landmarks)
+
+    name_index = NameIndex(degrees.names)
+
+
+def run_parallel(queries, workers, setup_args=(), estimate_only=False):
+    """
+    Answers queries like run(), fanning them out to a pool of worker
+    processes grouped by resolved source person, so a large group can
+    share one tree however its source is written. Queries naming an
+    unknown person are answered here. Results are still yielded in
+    input order.
+
+    Workers are forked so they inherit the already set up data read-only.
+    Where fork is unavailable each worker repeats setup(*setup_args)
+    without writing files; with cache=True that maps the same snapshot
+    file, and the landmark file saved by the main process is loaded.
+    """
+    pending = {}
+    groups = defaultdict(list)
+    for index, (source_name, target_name) in enumerate(queries):
+        try:
+            source = resolve(source_name)
+            resolve(target_name)
+        except LookupError as e:
+            pending[index] = {"source": source_name, "target": target_name,
+                              "error": str(e)}
+            continue
+        groups[source].append((index, source_name, target_name))
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        pool = context.Pool(workers)
+    else:
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(workers, initializer=functools.partial(
+            setup, save=False), initargs=setup_args)
+
+    with pool:
+        next_index = 0
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+        task = functools.partial(answer_group, estimate_only=estimate_only)
+        # Batch groups so single queries are not sent one at a time
+        chunksize = max(1, len(groups) // (4 * workers))
+        for results in pool.imap_unordered(task, groups.values(), chunksize):
+            pending.update(results)
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees queries, one JSON line each.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file of source<TAB>target lines (default stdin)")
+    parser.add_argument("--compact", action="store_true",
+                        help="store the star graph in compact CSR arrays")
+    parser.add_argument("--cache", action="store_true",
+                        help="load from and write a snapshot of the data")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--landmarks", metavar="PATH",
+                        help="landmark index file, built if missing")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only report landmark bounds on the degrees")
+    parser.add_argument("--delta", metavar="DIRECTORY",
+                        help="append the CSV rows in DIRECTORY before querying")
+    args = parser.parse_args()
+    if args.estimate and not args.landmarks:
+        parser.error("--estimate requires --landmarks")
+
+    setup_args = (args.directory, args.compact, args.cache,
+                  args.landmarks, args.delta)
+    setup(*setup_args)
+
+    if args.queries == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = read_queries(f)
+
+    if args.workers > 1:
+        results = run_parallel(queries, args.workers, setup_args,
+                               args.estimate)
+    else:
+        results = run(queries, args.estimate)
+    for result in results:
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
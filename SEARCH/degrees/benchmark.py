@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+from graph import Graph
+from landmarks import LandmarkIndex
+from util import SearchStats
+
+
+def synthetic(directory, people=20000, movies=5000, cast=6, seed=0):
+    """
+    Writes a random people/movies/stars dataset to directory. Casts are
+    drawn with a skew towards low ids so a few people are very prolific,
+    as in the real data.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{directory}/people.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            writer.writerow([i, f"Person {i}", 1900 + i % 100])
+    with open(f"{directory}/movies.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            writer.writerow([i, f"Movie {i}", 1900 + i % 120])
+    with open(f"{directory}/stars.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            for _ in range(cast):
+                person = int(people * rng.random() ** 2)
+                writer.writerow([person, movie])
+
+
+def queries(count, seed=0):
+    """
+    Returns a reproducible list of (source, target) person_id pairs
+    drawn from the loaded data.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(count)]
+
+
+def strategies(landmark_count):
+    """
+    Returns a dictionary of strategy name to search function, each taking
+    (source, target, stats). Expects data loaded without compact=True.
+    """
+    graph = Graph.build(degrees.people, degrees.movies, (
+        (person_id, movie_id)
+        for person_id, person in degrees.people.items()
+        for movie_id in person["movies"]
+    ))
+    index = LandmarkIndex.build(landmark_count)
+    return {
+        "bfs": degrees.shortest_path,
+        "bidirectional": degrees.bidirectional_shortest_path,
+        "compact": graph.shortest_path,
+        "landmarks": index.shortest_path
+    }
+
+
+def measure(search, pairs, memory=False):
+    """
+    Runs search over every pair and returns its summary statistics
+    and the degrees it found for each pair.
+    """
+    times = []
+    explored = []
+    peaks = []
+    allocated = []
+    lengths = []
+    for source, target in pairs:
+        stats = SearchStats()
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        path = search(source, target, stats)
+        times.append(time.perf_counter() - start)
+        if memory:
+            allocated.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        explored.append(stats.explored)
+        peaks.append(stats.frontier_peak)
+        lengths.append(None if path is None else len(path))
+
+    summary = {
+        "queries": len(pairs),
+        "total_seconds": sum(times),
+        "median_ms": 1000 * statistics.median(times),
+        "p95_ms": 1000 * percentile(times, 95),
+        "mean_explored": statistics.mean(explored),
+        "max_explored": max(explored),
+        "max_frontier": max(peaks)
+    }
+    if memory:
+        summary["max_memory_kb"] = max(allocated) / 1024
+    return summary, lengths
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of values by the nearest-rank method.
+    """
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[int(rank)]
+
+
+def run(directory, count, seed, landmark_count, memory=False):
+    """
+    Loads a dataset, benchmarks every strategy on the same queries and
+    returns a dictionary of results per strategy. Raises AssertionError
+    if two strategies disagree on the degrees of any query.
+    """
+    degrees.landmarks = None
+    degrees.load_data(directory)
+
+    pairs = queries(count, seed)
+    results = {}
+    expected = None
+    for name, search in strategies(landmark_count).items():
+        summary, lengths = measure(search, pairs, memory)
+        if expected is None:
+            expected = lengths
+        elif lengths != expected:
+            raise AssertionError(f"{name} disagrees with bfs on degrees")
+        results[name] = summary
+    return results
+
+
+def report(dataset, results):
+    """
+    Prints a table of results per strategy.
+    """
+    print(dataset)
+    columns = ["median_ms", "p95_ms", "mean_explored",
+               "max_explored", "max_frontier", "max_memory_kb"]
+    print(f"    {'strategy':<14}" + "".join(f"{c:>15}" for c in columns))
+    for name, summary in results.items():
+        cells = "".join(
+            f"{summary[c]:>15.2f}" if c in summary else f"{'-':>15}"
+            for c in columns
+        )
+        print(f"    {name:<14}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees search strategies.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--people", type=int, default=20000,
+                        help="people in the synthetic dataset")
+    parser.add_argument("--memory", action="store_true",
+                        help="also trace peak memory per query (slower)")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args()
+
+    all_results = {}
+    all_results["small"] = run("small", args.queries, args.seed,
+                               args.landmarks, args.memory)
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic(directory, people=args.people,
+                  movies=args.people // 4, seed=args.seed)
+        all_results["synthetic"] = run(directory, args.queries, args.seed,
+                                       args.landmarks, args.memory)
+
+    if args.json:
+        print(json.dumps(all_results, indent=2))
+    else:
+        for dataset, results in all_results.items():
+            report(dataset, results)
+
+
+if __name__ == "__main__":
+    main()
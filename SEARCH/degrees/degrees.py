@@ -1,6 +1,10 @@
+import argparse
 import csv
+import os
 import sys
 
+import snapshot
+from graph import Graph, Records, join_paths
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,20 +16,64 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed star graph, used instead of the "movies" and
+# "stars" sets above when data is loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Identifies the loaded data, as the fingerprint of its directory and
+# of each delta directory applied since, so that indexes built over
+# the data can tell whether they are stale
+data_source = None
+
+# Optional landmarks.LandmarkIndex; when set, shortest_path runs
+# an A* search guided by its precomputed distances
+landmarks = None
+
+
+def load_data(directory, compact=False, cache=False):
     """
     Load data from CSV files into memory.
+
+    With compact=True the star relation is stored in a CSR Graph
+    and people and movies only keep their descriptive fields, stored
+    column by column and indexed through the graph's id mappings.
+    With cache=True (which implies compact) the parsed data is written
+    to a snapshot file in the directory and memory-mapped on later loads
+    for as long as the CSV files are unchanged.
+    Any previously loaded data is replaced.
     """
+    global names, people, movies, graph, data_source
+    names = {}
+    people = {}
+    movies = {}
+    graph = None
+    data_source = {"data": snapshot.fingerprint(directory), "deltas": []}
+
+    if cache:
+        compact = True
+        loaded = snapshot.load(directory)
+        if loaded is not None:
+            # Mappings over the memory-mapped file, read on first use
+            names, people, movies, graph, data_source["deltas"] = loaded
+            return
+
+    if compact:
+        # Columns share the id lists and index dicts later given to Graph
+        person_ids, person_index = [], {}
+        movie_ids, movie_index = [], {}
+        people = Records(person_ids, person_index, {"name": [], "birth": []})
+        movies = Records(movie_ids, movie_index, {"title": [], "year": []})
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -37,13 +85,24 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        if compact:
+            graph = Graph.build(
+                person_ids, movie_ids,
+                ((row["person_id"], row["movie_id"]) for row in reader),
+                person_index, movie_index
+            )
+            if cache:
+                snapshot.save(directory, names, people, movies, graph,
+                              data_source["deltas"])
+            return
         for row in reader:
             try:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
@@ -52,14 +111,104 @@ def load_data(directory):
                 pass
 
 
+def load_delta(directory):
+    """
+    Appends rows from whichever of people.csv, movies.csv and stars.csv
+    exist in directory to the already loaded data, without reloading it.
+    Returns the set of person_ids whose neighbors changed, so that
+    caches built over the old data can be refreshed only where affected.
+    """
+    changed = set()
+    delta = snapshot.fingerprint(directory)
+    if delta not in data_source["deltas"]:
+        data_source["deltas"].append(delta)
+
+    if os.path.exists(f"{directory}/people.csv"):
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                add_person(row["id"], row["name"], row["birth"])
+
+    if os.path.exists(f"{directory}/movies.csv"):
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                add_movie(row["id"], row["title"], row["year"])
+
+    if os.path.exists(f"{directory}/stars.csv"):
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                changed |= add_star(row["person_id"], row["movie_id"])
+
+    return changed
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data.
+    """
+    if person_id in people:
+        return
+    people[person_id] = {
+        "name": name,
+        "birth": birth
+    }
+    if graph is None:
+        people[person_id]["movies"] = set()
+    else:
+        graph.add_person(person_id)
+    names.setdefault(name.lower(), set()).add(person_id)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie to the loaded data.
+    """
+    if movie_id in movies:
+        return
+    movies[movie_id] = {
+        "title": title,
+        "year": year
+    }
+    if graph is None:
+        movies[movie_id]["stars"] = set()
+    else:
+        graph.add_movie(movie_id)
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie.
+    Returns the set of person_ids whose neighbors changed: the person
+    and everyone else in the movie. Unknown ids and repeated rows
+    change nothing.
+    """
+    if person_id not in people or movie_id not in movies:
+        return set()
+
+    if graph is None:
+        if movie_id in people[person_id]["movies"]:
+            return set()
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+        return set(movies[movie_id]["stars"])
+
+    if not graph.add_star(person_id, movie_id):
+        return set()
+    movie = graph.movie_index[movie_id]
+    return {graph.person_ids[star] for star in graph.stars_of(movie)}
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="store the star graph in compact CSR arrays")
+    parser.add_argument("--cache", action="store_true",
+                        help="load from and write a snapshot of the data")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, cache=args.cache)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +218,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = bidirectional_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -84,13 +233,19 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+    If stats is a util.SearchStats, the search records into it
+    how many people it expanded and the largest frontier it held.
     """
+    if landmarks is not None:
+        return landmarks.shortest_path(source, target, stats)
+    if graph is not None:
+        return graph.shortest_path(source, target, stats)
 
     # TODO
     start = Node(state=source, parent=None, action=None)
@@ -108,6 +263,8 @@ def shortest_path(source, target):
             # Choose a node from the frontier
             node = frontier.remove()
             num_explored += 1
+            if stats is not None:
+                stats.update(1, len(frontier.frontier) + 1)
 
             # If node is the goal, then we have a solution
             if node.state == target:
@@ -128,6 +285,62 @@ def shortest_path(source, target):
                     frontier.add(child)
 
 
+def bidirectional_shortest_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing one BFS frontier
+    from each end and stopping as soon as they meet.
+
+    If no possible path, returns None.
+    Records into stats as shortest_path does.
+    """
+    if graph is not None:
+        return graph.shortest_path(source, target, stats)
+
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie_id, neighbour_id) towards its end
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        if stats is not None:
+            stats.update(min(len(forward_layer), len(backward_layer)),
+                         len(forward_layer) + len(backward_layer))
+
+        # Always expand the smaller of the two frontiers
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meet = expand_layer(forward_layer, forward, backward)
+        else:
+            backward_layer, meet = expand_layer(backward_layer, backward, forward)
+
+        if meet is not None:
+            return join_paths(meet, forward, backward)
+
+    return None
+
+
+def expand_layer(layer, parents, other_parents):
+    """
+    Expands every person in a BFS layer by one step, recording parents.
+    Returns the next layer and the first person already reached
+    from the other end, or None if the frontiers have not met.
+    """
+    next_layer = []
+    for person_id in layer:
+        for movie_id, star_id in neighbors_for_person(person_id):
+            if star_id in parents:
+                continue
+            parents[star_id] = (movie_id, person_id)
+            if star_id in other_parents:
+                return next_layer, star_id
+            next_layer.append(star_id)
+    return next_layer, None
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -159,6 +372,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
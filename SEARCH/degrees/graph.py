@@ -0,0 +1,329 @@
+from array import array
+from collections import defaultdict
+from collections.abc import MutableMapping
+
+
+class Graph():
+    """
+    Bipartite graph of people and the movies they starred in, with
+    IMDB ids interned to dense integers and both adjacency directions
+    stored as compressed sparse rows.
+
+    The stars of movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]],
+    and the movies of person p are found the same way from person_offsets.
+    Rows added after the graph was built are kept in the extra_movies
+    and extra_people overlays until merge() folds them into the arrays.
+    The id to index mappings are built from the id lists unless given.
+    The arrays are held as memoryviews, so rows are sliced without copying.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_offsets = memoryview(person_offsets)
+        self.person_movies = memoryview(person_movies)
+        self.movie_offsets = memoryview(movie_offsets)
+        self.movie_people = memoryview(movie_people)
+        self.extra_movies = defaultdict(list)
+        self.extra_people = defaultdict(list)
+
+    @classmethod
+    def build(cls, person_ids, movie_ids, stars,
+              person_index=None, movie_index=None):
+        """
+        Builds a graph from lists of person and movie ids and an iterable
+        of (person_id, movie_id) pairs. Pairs naming unknown ids are skipped.
+        If the id to index mappings are given, the graph shares them and
+        the id lists instead of copying the lists.
+        """
+        if person_index is None:
+            person_ids = list(person_ids)
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_ids = list(movie_ids)
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+        # Collect edges as two parallel integer arrays
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, movie_id in stars:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is None or movie is None:
+                continue
+            edge_people.append(person)
+            edge_movies.append(movie)
+
+        person_offsets, person_movies = compress(
+            len(person_ids), edge_people, edge_movies)
+        movie_offsets, movie_people = compress(
+            len(movie_ids), edge_movies, edge_people)
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies,
+                   movie_offsets, movie_people,
+                   person_index, movie_index)
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies a person starred in.
+        """
+        return row(self.person_offsets, self.person_movies,
+                   self.extra_movies, person)
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in a movie.
+        """
+        return row(self.movie_offsets, self.movie_people,
+                   self.extra_people, movie)
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def add_person(self, person_id):
+        """
+        Interns a new person_id and returns its index.
+        """
+        if person_id not in self.person_index:
+            self.person_index[person_id] = len(self.person_ids)
+            self.person_ids.append(person_id)
+        return self.person_index[person_id]
+
+    def add_movie(self, movie_id):
+        """
+        Interns a new movie_id and returns its index.
+        """
+        if movie_id not in self.movie_index:
+            self.movie_index[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+        return self.movie_index[movie_id]
+
+    def add_star(self, person_id, movie_id):
+        """
+        Records that a known person starred in a known movie.
+        Returns False if the edge was already present.
+        """
+        person = self.person_index[person_id]
+        movie = self.movie_index[movie_id]
+        if movie in self.movies_of(person):
+            return False
+        self.extra_movies[person].append(movie)
+        self.extra_people[movie].append(person)
+        return True
+
+    def merge(self):
+        """
+        Folds the added rows into the CSR arrays.
+        """
+        unchanged = (not self.extra_movies
+                     and len(self.person_offsets) == len(self.person_ids) + 1
+                     and len(self.movie_offsets) == len(self.movie_ids) + 1)
+        if unchanged:
+            return
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_of(person):
+                edge_people.append(person)
+                edge_movies.append(movie)
+        person_offsets, person_movies = compress(
+            len(self.person_ids), edge_people, edge_movies)
+        movie_offsets, movie_people = compress(
+            len(self.movie_ids), edge_movies, edge_people)
+        self.person_offsets = memoryview(person_offsets)
+        self.person_movies = memoryview(person_movies)
+        self.movie_offsets = memoryview(movie_offsets)
+        self.movie_people = memoryview(movie_people)
+        self.extra_movies.clear()
+        self.extra_people.clear()
+
+    def neighbors_for_person(self, person_id):
+        """
+        Yields (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        person_ids = self.person_ids
+        movie_ids = self.movie_ids
+        for movie, person in self.neighbors(self.person_index[person_id]):
+            yield movie_ids[movie], person_ids[person]
+
+    def shortest_path(self, source_id, target_id, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        path = self.search(self.person_index[source_id],
+                           self.person_index[target_id], stats)
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+    def search(self, source, target, stats=None):
+        """
+        Bidirectional BFS over person indices. Returns the shortest list
+        of (movie, person) index pairs from source to target, or None.
+        Records expanded people and frontier sizes into stats if given.
+        """
+        if source == target:
+            return []
+
+        # Maps each reached person to (movie, neighbour) towards its end
+        forward = {source: None}
+        backward = {target: None}
+        # Movies whose stars have already been expanded from each end
+        forward_movies = set()
+        backward_movies = set()
+        forward_layer = [source]
+        backward_layer = [target]
+
+        while forward_layer and backward_layer:
+            if stats is not None:
+                stats.update(min(len(forward_layer), len(backward_layer)),
+                             len(forward_layer) + len(backward_layer))
+            if len(forward_layer) <= len(backward_layer):
+                forward_layer, meet = self.expand_layer(
+                    forward_layer, forward, forward_movies, backward)
+            else:
+                backward_layer, meet = self.expand_layer(
+                    backward_layer, backward, backward_movies, forward)
+
+            if meet is not None:
+                return join_paths(meet, forward, backward)
+
+        return None
+
+    def expand_layer(self, layer, parents, seen_movies, other_parents):
+        """
+        Expands every person in a BFS layer by one step, recording parents.
+        Returns the next layer and the first person already reached
+        from the other end, or None if the frontiers have not met.
+        """
+        next_layer = []
+        for person in layer:
+            for movie in self.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for star in self.stars_of(movie):
+                    if star in parents:
+                        continue
+                    parents[star] = (movie, person)
+                    if star in other_parents:
+                        return next_layer, star
+                    next_layer.append(star)
+        return next_layer, None
+
+
+class Records(MutableMapping):
+    """
+    Mapping of ids to records stored column by column: field f of the
+    id at index i is columns[f][i], where index maps ids to i and ids
+    lists them in order. Shares ids and index with a Graph, so the
+    compact layout keeps one dictionary per id space instead of one per
+    person or movie. Records are built on access; setting one stores its
+    fields, interning the id if it is new.
+    """
+
+    def __init__(self, ids, index, columns):
+        self.ids = ids
+        self.index = index
+        self.columns = columns
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {field: column[i] for field, column in self.columns.items()}
+
+    def __setitem__(self, key, record):
+        i = self.index.get(key)
+        if i is None:
+            self.index[key] = len(self.ids)
+            self.ids.append(key)
+            for field, column in self.columns.items():
+                column.append(record[field])
+        else:
+            for field, column in self.columns.items():
+                column[i] = record[field]
+
+    def __delitem__(self, key):
+        raise TypeError("records cannot be removed from a compact table")
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def row(offsets, values, extra, index):
+    """
+    Returns the CSR row at index followed by any overlay entries.
+    Indices added after the arrays were built have an empty CSR row.
+    """
+    if index + 1 < len(offsets):
+        values = values[offsets[index]:offsets[index + 1]]
+    else:
+        values = []
+    if index in extra:
+        return list(values) + extra[index]
+    return values
+
+
+def compress(size, rows, columns):
+    """
+    Converts parallel arrays of (row, column) edges into CSR form.
+    Returns the offsets array of length size + 1 and the columns array.
+    """
+    offsets = array("i", bytes(4 * (size + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("i", offsets[:-1])
+    packed = array("i", bytes(4 * len(columns)))
+    for row, column in zip(rows, columns):
+        packed[cursor[row]] = column
+        cursor[row] += 1
+    return offsets, packed
+
+
+def join_paths(meet, forward, backward):
+    """
+    Builds the path through the meeting node
+    from the parent maps of both search directions.
+    """
+    journey = []
+    node = meet
+    while forward[node] is not None:
+        edge, parent = forward[node]
+        journey.append((edge, node))
+        node = parent
+    journey.reverse()
+
+    node = meet
+    while backward[node] is not None:
+        edge, child = backward[node]
+        journey.append((edge, child))
+        node = child
+    return journey
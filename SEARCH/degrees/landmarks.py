@@ -0,0 +1,277 @@
+import copy
+import json
+import math
+import struct
+from array import array
+
+import degrees
+from util import Node, PriorityFrontier
+
+MAGIC = b"DEGL"
+VERSION = 3
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = -1
+
+
+class LandmarkIndex():
+    """
+    Precomputed BFS distances from a few well-connected people
+    ("landmarks") to everyone, used to bound degrees of separation
+    without searching and to guide A* search with the ALT heuristic.
+
+    Distances are arrays indexed by each person's position in
+    degrees.people, which is also the compact graph's person index.
+    The index records the degrees.data_source it was computed from.
+    """
+
+    def __init__(self, landmarks, distances, data_source=None):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.data_source = data_source
+        if degrees.graph is not None:
+            # Positions are the compact graph's own person indices
+            self.person_ids = degrees.graph.person_ids
+            self.position = degrees.graph.person_index
+        else:
+            self.person_ids = list(degrees.people)
+            self.position = {pid: i for i, pid in enumerate(self.person_ids)}
+
+    @classmethod
+    def build(cls, count=16):
+        """
+        Picks the count people who starred in the most movies
+        and computes BFS distances from each of them.
+        """
+        ranked = sorted(degrees.people, key=movie_count, reverse=True)
+        index = cls(ranked[:count], [],
+                    copy.deepcopy(degrees.data_source))
+        index.distances = [index.distances_from(landmark)
+                           for landmark in index.landmarks]
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by save(). Returns None if the file is
+        missing or was computed from other data than degrees.data_source.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        if data[:4] != MAGIC:
+            return None
+        version, size = struct.unpack_from("<II", data, 4)
+        if version != VERSION:
+            return None
+        header = json.loads(data[12:12 + size])
+        if (header["data_source"] != degrees.data_source
+                or header["people"] != len(degrees.people)):
+            return None
+
+        offset = 12 + size
+        width = 2 * header["people"]
+        distances = []
+        for _ in header["landmarks"]:
+            distances.append(array("h", data[offset:offset + width]))
+            offset += width
+        return cls(header["landmarks"], distances, header["data_source"])
+
+    def save(self, path):
+        """
+        Writes the landmarks and their distance arrays to a file.
+        """
+        header = json.dumps({
+            "landmarks": self.landmarks,
+            "people": len(self.person_ids),
+            "data_source": self.data_source
+        }).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<II", VERSION, len(header)))
+            f.write(header)
+            for distances in self.distances:
+                f.write(distances.tobytes())
+
+    def update(self, changed):
+        """
+        Brings the index up to date after degrees.load_delta.
+        New people are appended as unreachable, and only landmarks
+        that can reach one of the changed person_ids are recomputed.
+        The index's data_source becomes the current degrees.data_source.
+        Returns the number of landmarks recomputed.
+        """
+        self.data_source = copy.deepcopy(degrees.data_source)
+        # The compact graph has already interned any new people
+        if degrees.graph is None:
+            for person_id in degrees.people:
+                if person_id not in self.position:
+                    self.position[person_id] = len(self.person_ids)
+                    self.person_ids.append(person_id)
+        for distances in self.distances:
+            distances.extend(
+                array("h", [UNREACHABLE]) * (len(self.person_ids) - len(distances)))
+
+        recomputed = 0
+        positions = [self.position[person_id] for person_id in changed]
+        for i, landmark in enumerate(self.landmarks):
+            distances = self.distances[i]
+            if any(distances[p] != UNREACHABLE for p in positions):
+                self.distances[i] = self.distances_from(landmark)
+                recomputed += 1
+        return recomputed
+
+    def neighbors(self, position):
+        """
+        Yields (movie, position) pairs for people who starred with the
+        person at a given position, where movie is the compact graph's
+        movie index if there is one and the movie_id otherwise.
+        """
+        if degrees.graph is not None:
+            yield from degrees.graph.neighbors(position)
+        else:
+            person_id = self.person_ids[position]
+            for movie_id, star_id in degrees.neighbors_for_person(person_id):
+                yield movie_id, self.position[star_id]
+
+    def movie_id(self, movie):
+        """
+        Returns the movie_id of a movie yielded by neighbors().
+        """
+        if degrees.graph is not None:
+            return degrees.graph.movie_ids[movie]
+        return movie
+
+    def distances_from(self, person_id):
+        """
+        Returns an array of BFS distances from a person to everyone.
+        """
+        distances = array("h", [UNREACHABLE]) * len(self.person_ids)
+        source = self.position[person_id]
+        distances[source] = 0
+        layer = [source]
+        depth = 0
+        seen_movies = set()
+        while layer:
+            depth += 1
+            next_layer = []
+            for star in self.stars_near(layer, seen_movies):
+                if distances[star] == UNREACHABLE:
+                    distances[star] = depth
+                    next_layer.append(star)
+            layer = next_layer
+        return distances
+
+    def stars_near(self, layer, seen_movies):
+        """
+        Yields the positions of people who starred with anyone in layer.
+        On the compact graph, each movie is expanded only once across
+        calls sharing seen_movies.
+        """
+        graph = degrees.graph
+        if graph is None:
+            for person in layer:
+                for _, star in self.neighbors(person):
+                    yield star
+            return
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                yield from graph.stars_of(movie)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two person_ids. Both are math.inf if the landmarks
+        prove the two people are not connected.
+        """
+        if source == target:
+            return 0, 0
+        s = self.position[source]
+        t = self.position[target]
+        lower = 1
+        upper = math.inf
+        for distances in self.distances:
+            ds = distances[s]
+            dt = distances[t]
+            if (ds == UNREACHABLE) != (dt == UNREACHABLE):
+                return math.inf, math.inf
+            if ds != UNREACHABLE:
+                lower = max(lower, abs(ds - dt))
+                upper = min(upper, ds + dt)
+        return lower, upper
+
+    def heuristic(self, position, target):
+        """
+        Returns the ALT lower bound on the distance between two positions.
+        """
+        estimate = 0
+        for distances in self.distances:
+            dp = distances[position]
+            dt = distances[target]
+            if dp != UNREACHABLE and dt != UNREACHABLE:
+                estimate = max(estimate, abs(dp - dt))
+        return estimate
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, using A* search
+        guided by the landmark lower bounds.
+
+        If no possible path, returns None.
+        Records expanded people and frontier sizes into stats if given.
+        """
+        lower, _ = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+
+        goal = self.position[target]
+        start = self.position[source]
+        frontier = PriorityFrontier()
+        frontier.add(Node(state=start, parent=None, action=None),
+                     self.heuristic(start, goal))
+        cost = {start: 0}
+        explored = set()
+
+        while not frontier.empty():
+            node = frontier.remove()
+            if node.state in explored:
+                continue
+            if stats is not None:
+                stats.update(1, len(frontier.frontier) + 1)
+            if node.state == goal:
+                journey = []
+                while node.parent is not None:
+                    journey.append((self.movie_id(node.action),
+                                    self.person_ids[node.state]))
+                    node = node.parent
+                journey.reverse()
+                return journey
+            explored.add(node.state)
+
+            for movie, star in self.neighbors(node.state):
+                if star in explored:
+                    continue
+                g = cost[node.state] + 1
+                if g < cost.get(star, math.inf):
+                    cost[star] = g
+                    child = Node(state=star, parent=node, action=movie)
+                    frontier.add(child, g + self.heuristic(star, goal))
+
+        return None
+
+
+def movie_count(person_id):
+    """
+    Returns the number of movies a person starred in.
+    """
+    if degrees.graph is not None:
+        person = degrees.graph.person_index[person_id]
+        return len(degrees.graph.movies_of(person))
+    return len(degrees.people[person_id]["movies"])
@@ -0,0 +1,145 @@
+import bisect
+from collections import defaultdict
+
+# Trigrams found in more names than this are too common to be worth
+# counting when gathering fuzzy candidates
+MAX_POSTINGS = 5000
+
+
+class NameIndex():
+    """
+    Non-interactive lookup of person_ids by name. Supports exact,
+    prefix (autocomplete) and fuzzy matching, returning ranked
+    candidates instead of prompting for ambiguous names.
+    """
+
+    def __init__(self, names):
+        # Maps lowercase names to sets of person_ids, as degrees.names does
+        self.names = names
+        # Sorted lowercase names for prefix search by bisection
+        self.sorted_names = sorted(names)
+        # Maps each character trigram to the names containing it
+        self.trigrams = defaultdict(list)
+        for name in self.sorted_names:
+            for gram in set(trigrams(name)):
+                self.trigrams[gram].append(name)
+
+    def exact(self, name):
+        """
+        Returns the person_ids whose name matches exactly, ignoring case.
+        """
+        return sorted(self.names.get(name.lower(), set()))
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to limit (name, person_id) pairs whose name starts
+        with text, in alphabetical order.
+        """
+        text = text.lower()
+        results = []
+        i = bisect.bisect_left(self.sorted_names, text)
+        while i < len(self.sorted_names) and len(results) < limit:
+            name = self.sorted_names[i]
+            if not name.startswith(text):
+                break
+            for person_id in sorted(self.names[name]):
+                results.append((name, person_id))
+            i += 1
+        return results[:limit]
+
+    def fuzzy(self, text, limit=10, max_distance=2,
+              max_postings=MAX_POSTINGS):
+        """
+        Returns up to limit (name, person_id, distance) triples for names
+        within max_distance edits of text, closest first. Candidates are
+        drawn from names sharing trigrams with text, skipping trigrams
+        in more than max_postings names unless all of them are.
+        """
+        text = text.lower()
+        grams = set(trigrams(text))
+        postings = sorted((self.trigrams.get(gram, ()) for gram in grams),
+                          key=len)
+        kept = [names for names in postings if len(names) <= max_postings]
+        if not kept:
+            kept = postings[:1]
+        candidates = set()
+        for names in kept:
+            candidates.update(names)
+
+        # Each edit destroys at most three trigrams, so names sharing too
+        # few of the trigrams of text are rejected before edit_distance
+        needed = len(grams) - 3 * max_distance
+        scored = []
+        for name in candidates:
+            if abs(len(name) - len(text)) > max_distance:
+                continue
+            count = len(grams.intersection(trigrams(name)))
+            if count < needed:
+                continue
+            distance = edit_distance(text, name, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -count, name))
+        scored.sort()
+
+        results = []
+        for distance, _, name in scored:
+            for person_id in sorted(self.names[name]):
+                results.append((name, person_id, distance))
+        return results[:limit]
+
+    def search(self, text, limit=10):
+        """
+        Returns up to limit ranked (name, person_id) candidates for text:
+        exact matches first, then prefix matches, then fuzzy matches.
+        """
+        results = []
+        seen = set()
+
+        def extend(candidates):
+            for candidate in candidates:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    results.append(candidate)
+
+        extend((text.lower(), person_id) for person_id in self.exact(text))
+        extend(self.prefix(text, limit))
+        # Fuzzy matching is the slowest, so skip it once limit is reached
+        if len(results) < limit:
+            extend((name, person_id)
+                   for name, person_id, _ in self.fuzzy(text, limit))
+        return results[:limit]
+
+
+def trigrams(text):
+    """
+    Returns the character trigrams of text, padded at both ends.
+    """
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, bound):
+    """
+    Returns the Levenshtein distance between a and b,
+    or bound + 1 as soon as it is known to exceed bound.
+    Only the diagonal band of width 2 * bound + 1 is computed,
+    since any path leaving it costs more than bound.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    over = bound + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        low = max(1, i - bound)
+        high = min(len(b), i + bound)
+        current = [over] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1,
+                             current[j - 1] + 1,
+                             previous[j - 1] + (ca != b[j - 1]))
+        if min(current[low - 1:high + 1]) > bound:
+            return over
+        previous = current
+    return min(previous[-1], over)
@@ -0,0 +1,296 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableMapping
+
+from graph import Graph
+
+MAGIC = b"DEGS"
+VERSION = 3
+FILENAME = "snapshot.bin"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Order in which the CSR arrays are laid out after the tables
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+
+
+def path_for(directory):
+    """
+    Returns the snapshot path for a data directory.
+    """
+    return os.path.join(directory, FILENAME)
+
+
+def fingerprint(directory):
+    """
+    Returns the size and mtime of each source CSV, or None for a
+    missing one, used to detect whether data built from the directory
+    is stale.
+    """
+    sources = {}
+    for name in SOURCES:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            sources[name] = None
+            continue
+        sources[name] = [stat.st_size, stat.st_mtime_ns]
+    return sources
+
+
+class Strings():
+    """
+    Sequence of strings stored in a snapshot as one UTF-8 blob and the
+    offset of each string in it. Strings appended after loading are
+    kept in a list, so the sequence can stand in for Graph id lists.
+    """
+
+    def __init__(self, buffer, start, offsets):
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+        self.size = len(offsets) - 1
+        self.extra = []
+
+    def raw(self, i):
+        """
+        Returns the encoded bytes of the i-th stored string.
+        """
+        return self.buffer[self.start + self.offsets[i]:
+                           self.start + self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if i < self.size:
+            return self.raw(i).decode("utf-8")
+        return self.extra[i - self.size]
+
+    def __len__(self):
+        return self.size + len(self.extra)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, string):
+        self.extra.append(string)
+
+
+class Table(MutableMapping):
+    """
+    Mapping whose keys are stored in a snapshot string table and found
+    by binary search, in the order given by the order array or in table
+    order if it is None. The value for the key at table position p is
+    built by value(p) on first access and kept, as are entries set
+    later, so values can be updated in place as with a dict.
+    """
+
+    def __init__(self, keys, order, value):
+        self.keys_table = keys
+        self.order = order
+        self.value = value
+        self.size = keys.size
+        self.loaded = {}
+        self.added = []
+
+    def position(self, key):
+        """
+        Returns the table position of a stored key, or None.
+        """
+        target = key.encode("utf-8")
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            p = middle if self.order is None else self.order[middle]
+            if self.keys_table.raw(p) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size:
+            p = low if self.order is None else self.order[low]
+            if self.keys_table.raw(p) == target:
+                return p
+        return None
+
+    def __getitem__(self, key):
+        if key in self.loaded:
+            return self.loaded[key]
+        p = self.position(key)
+        if p is None:
+            raise KeyError(key)
+        value = self.loaded[key] = self.value(p)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.loaded and self.position(key) is None:
+            self.added.append(key)
+        self.loaded[key] = value
+
+    def __delitem__(self, key):
+        raise TypeError("entries cannot be removed from a snapshot table")
+
+    def __contains__(self, key):
+        return key in self.loaded or self.position(key) is not None
+
+    def __iter__(self):
+        for p in range(self.size):
+            yield self.keys_table[p]
+        yield from self.added
+
+    def __len__(self):
+        return self.size + len(self.added)
+
+
+def encode_strings(strings):
+    """
+    Returns the offsets array and UTF-8 blob storing strings.
+    """
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def sorted_order(strings):
+    """
+    Returns the positions of strings ordered by their UTF-8 encoding.
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    return array("i", sorted(range(len(encoded)), key=encoded.__getitem__))
+
+
+def save(directory, names, people, movies, graph, deltas=()):
+    """
+    Writes names, people, movies and the CSR graph to the directory's
+    snapshot file. Every table is stored as raw arrays and string blobs
+    so it can be memory-mapped back without parsing. Rows added with
+    degrees.load_delta are merged into the arrays first, and deltas
+    lists the fingerprints of the delta directories they came from.
+    """
+    graph.merge()
+    person_ids = list(graph.person_ids)
+    movie_ids = list(graph.movie_ids)
+    name_keys = sorted(names, key=lambda name: name.encode("utf-8"))
+    name_offsets = array("q", [0])
+    name_people = array("i")
+    for name in name_keys:
+        name_people.extend(sorted(graph.person_index[person_id]
+                                  for person_id in names[name]))
+        name_offsets.append(len(name_people))
+
+    sections = []
+
+    def add_strings(name, strings):
+        offsets, blob = encode_strings(strings)
+        sections.append((name + ".offsets", "q", offsets))
+        sections.append((name, "B", blob))
+
+    add_strings("person_ids", person_ids)
+    sections.append(("person_order", "i", sorted_order(person_ids)))
+    add_strings("person_names", [people[pid]["name"] for pid in person_ids])
+    add_strings("person_births", [people[pid]["birth"] for pid in person_ids])
+    add_strings("movie_ids", movie_ids)
+    sections.append(("movie_order", "i", sorted_order(movie_ids)))
+    add_strings("movie_titles", [movies[mid]["title"] for mid in movie_ids])
+    add_strings("movie_years", [movies[mid]["year"] for mid in movie_ids])
+    add_strings("names", name_keys)
+    sections.append(("name_offsets", "q", name_offsets))
+    sections.append(("name_people", "i", name_people))
+    for name in ARRAYS:
+        sections.append((name, "i", getattr(graph, name)))
+
+    header = {
+        "sources": fingerprint(directory),
+        "deltas": list(deltas),
+        "sections": [[name, typecode, len(data)]
+                     for name, typecode, data in sections]
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    # Pad so every section starts on an 8-byte boundary
+    encoded += b" " * (-(len(encoded) + 12) % 8)
+
+    temporary = path_for(directory) + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", VERSION, len(encoded)))
+        f.write(encoded)
+        for _, _, data in sections:
+            data = bytes(data)
+            f.write(data)
+            f.write(bytes(-len(data) % 8))
+    os.replace(temporary, path_for(directory))
+
+
+def load(directory):
+    """
+    Memory-maps the directory's snapshot file.
+    Returns (names, people, movies, graph, deltas), or None if there
+    is no snapshot or it no longer matches the source CSVs. The mappings
+    read their entries from the file on first access, and deltas is the
+    list passed to save().
+    """
+    try:
+        f = open(path_for(directory), "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+
+    if view[:4] != MAGIC:
+        return None
+    version, size = struct.unpack_from("<II", view, 4)
+    if version != VERSION:
+        return None
+    header = json.loads(bytes(view[12:12 + size]))
+    if header["sources"] != fingerprint(directory):
+        return None
+
+    # Maps section names to their arrays, or blob start offsets
+    sections = {}
+    offset = 12 + size
+    for name, typecode, length in header["sections"]:
+        width = struct.calcsize(typecode)
+        if typecode == "B":
+            sections[name] = offset
+        else:
+            sections[name] = view[offset:offset + width * length].cast(
+                typecode)
+        offset += width * length + (-width * length % 8)
+
+    def strings(name):
+        return Strings(buffer, sections[name], sections[name + ".offsets"])
+
+    person_ids = strings("person_ids")
+    movie_ids = strings("movie_ids")
+    person_names = strings("person_names")
+    person_births = strings("person_births")
+    movie_titles = strings("movie_titles")
+    movie_years = strings("movie_years")
+    name_offsets = sections["name_offsets"]
+    name_people = sections["name_people"]
+
+    people = Table(person_ids, sections["person_order"], lambda p: {
+        "name": person_names[p],
+        "birth": person_births[p]
+    })
+    movies = Table(movie_ids, sections["movie_order"], lambda m: {
+        "title": movie_titles[m],
+        "year": movie_years[m]
+    })
+    names = Table(strings("names"), None, lambda n: {
+        person_ids[p]
+        for p in name_people[name_offsets[n]:name_offsets[n + 1]]
+    })
+
+    graph = Graph(person_ids, movie_ids,
+                  *[sections[name] for name in ARRAYS],
+                  person_index=Table(person_ids, sections["person_order"],
+                                     lambda p: p),
+                  movie_index=Table(movie_ids, sections["movie_order"],
+                                    lambda m: m))
+    return names, people, movies, graph, header["deltas"]
@@ -0,0 +1,176 @@
+"""
+Bitboard Tic Tac Toe engine
+
+A position is a pair of 9-bit masks (x, o), one per player,
+where bit 3 * i + j is set if that player has marked cell (i, j).
+"""
+
+# Every cell occupied
+FULL = 0b111111111
+
+# Masks of the eight winning lines
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+]
+
+# The (i, j) action for each bit index
+ACTIONS = [(i, j) for i in range(3) for j in range(3)]
+
+# Cells in the order moves are tried: center, corners, then edges
+ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+# Kinds of value stored in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Transposition table: maps key(x, o) to the position's
+# (value, action, flag), where flag says whether value is exact
+# or only a lower or upper bound found under a narrowed window
+table = {}
+
+# Number of positions visited by search, for measuring pruning
+stats = {"nodes": 0}
+
+
+def from_board(board):
+    """
+    Returns the (x, o) masks of a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == "X":
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == "O":
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for the (x, o) masks.
+    """
+    board = []
+    for i in range(3):
+        row = []
+        for j in range(3):
+            bit = 1 << (3 * i + j)
+            row.append("X" if x & bit else "O" if o & bit else None)
+        board.append(row)
+    return board
+
+
+def key(x, o):
+    """
+    Returns a single integer identifying the position.
+    """
+    return x | o << 9
+
+
+def x_to_move(x, o):
+    """
+    Returns True if X has the next turn.
+    """
+    return bin(x).count("1") == bin(o).count("1")
+
+
+def won(mask):
+    """
+    Returns True if the mask contains a complete line.
+    """
+    for line in LINES:
+        if mask & line == line:
+            return True
+    return False
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 for a draw
+    and None if the game is not over.
+    """
+    if won(x):
+        return 1
+    if won(o):
+        return -1
+    if x | o == FULL:
+        return 0
+    return None
+
+
+def search(x, o, alpha=-1, beta=1):
+    """
+    Returns (value, action) for the position, with X maximizing,
+    using alpha-beta pruning over moves ordered by the table's
+    stored action first and then by ORDER.
+
+    Values are -1, 0 or 1, so a value at the edge of that range is
+    exact even when it falls outside the (alpha, beta) window.
+    """
+    stats["nodes"] += 1
+    k = x | o << 9
+    entry = table.get(k)
+    hint = None
+    if entry is not None:
+        value, action, flag = entry
+        if (flag == EXACT
+                or (flag == LOWER and value >= beta)
+                or (flag == UPPER and value <= alpha)):
+            return value, action
+        hint = action
+
+    value = utility(x, o)
+    if value is not None:
+        table[k] = (value, None, EXACT)
+        return value, None
+
+    empty = ~(x | o) & FULL
+    cells = ORDER
+    if hint is not None:
+        first = 3 * hint[0] + hint[1]
+        cells = [first] + [cell for cell in ORDER if cell != first]
+
+    window = alpha, beta
+    best = None
+    if x_to_move(x, o):
+        value = -2
+        for cell in cells:
+            bit = 1 << cell
+            if empty & bit:
+                v = search(x | bit, o, alpha, beta)[0]
+                if v > value:
+                    value, best = v, ACTIONS[cell]
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+    else:
+        value = 2
+        for cell in cells:
+            bit = 1 << cell
+            if empty & bit:
+                v = search(x, o | bit, alpha, beta)[0]
+                if v < value:
+                    value, best = v, ACTIONS[cell]
+                beta = min(beta, value)
+                if alpha >= beta:
+                    break
+
+    if value <= window[0] and value > -1:
+        flag = UPPER
+    elif value >= window[1] and value < 1:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table[k] = (value, best, flag)
+    return value, best
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on a
+    list-of-lists board, or None if the game is over.
+    """
+    return search(*from_board(board))[1]
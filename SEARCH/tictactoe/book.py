@@ -0,0 +1,128 @@
+"""
+Tic Tac Toe opening book
+
+Stores the optimal move for every reachable, unfinished 3x3 position,
+one entry per position up to the board's 8 rotations and reflections.
+Run this file to regenerate book.bin.
+"""
+import os
+import struct
+
+import bitboard
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Each entry is a 32-bit canonical key and the cell of its optimal move
+ENTRY = struct.Struct("<IB")
+
+
+def permutation(transform):
+    """
+    Returns where each cell index moves under transform((i, j)).
+    """
+    return [3 * transform(i, j)[0] + transform(i, j)[1]
+            for i in range(3) for j in range(3)]
+
+
+# Cell permutations for the 8 symmetries of the square
+SYMMETRIES = [permutation(t) for t in [
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i)
+]]
+
+# For each symmetry, the image of every 9-bit mask
+IMAGES = [
+    [sum(1 << perm[cell] for cell in range(9) if mask >> cell & 1)
+     for mask in range(512)]
+    for perm in SYMMETRIES
+]
+
+# Maps canonical keys to optimal cells, loaded on first lookup
+book = None
+
+
+def canonical(x, o):
+    """
+    Returns the smallest key of the position over all symmetries,
+    and the index of the symmetry that produces it.
+    """
+    return min((bitboard.key(images[x], images[o]), s)
+               for s, images in enumerate(IMAGES))
+
+
+def generate():
+    """
+    Solves every reachable position and returns the book as a
+    dictionary of canonical key to optimal cell.
+    """
+    entries = {}
+    stack = [(0, 0)]
+    seen = set()
+    while stack:
+        x, o = stack.pop()
+        k, s = canonical(x, o)
+        if k in seen or bitboard.utility(x, o) is not None:
+            continue
+        seen.add(k)
+
+        action = bitboard.search(x, o)[1]
+        cell = 3 * action[0] + action[1]
+        entries[k] = SYMMETRIES[s][cell]
+
+        empty = ~(x | o) & bitboard.FULL
+        for cell in range(9):
+            if empty >> cell & 1:
+                if bitboard.x_to_move(x, o):
+                    stack.append((x | 1 << cell, o))
+                else:
+                    stack.append((x, o | 1 << cell))
+    return entries
+
+
+def save(entries, path=PATH):
+    with open(path, "wb") as f:
+        for k in sorted(entries):
+            f.write(ENTRY.pack(k, entries[k]))
+
+
+def load(path=PATH):
+    """
+    Reads a book file into a dictionary, or returns an empty one
+    if the file does not exist.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}
+    return dict(ENTRY.iter_unpack(data))
+
+
+def lookup(board):
+    """
+    Returns the book's optimal (i, j) action for a 3x3 list-of-lists
+    board, or None if the position is not in the book.
+    """
+    global book
+    if book is None:
+        book = load()
+
+    x, o = bitboard.from_board(board)
+    k, s = canonical(x, o)
+    if k not in book:
+        return None
+    # Map the move back from the canonical orientation
+    cell = SYMMETRIES[s].index(book[k])
+    return bitboard.ACTIONS[cell]
+
+
+if __name__ == "__main__":
+    entries = generate()
+    save(entries)
+    print(f"{len(entries)} positions written to {PATH}")
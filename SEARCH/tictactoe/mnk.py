@@ -0,0 +1,231 @@
+"""
+m,n,k-game engine
+
+Plays on an m x n board where k marks in a row (horizontally,
+vertically or diagonally) win. Positions are pairs of bit masks as in
+the bitboard engine, with bit n * i + j standing for cell (i, j).
+Boards too large to solve are searched by iterative deepening
+alpha-beta under a time budget, scoring unfinished positions
+with a heuristic evaluation.
+"""
+import time
+
+# Seconds per move when no time limit is given for a board larger
+# than 3x3, which cannot be searched to the end in reasonable time
+TIME_LIMIT = 1.0
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+    """
+    Precomputed masks for one board size and line length.
+    """
+
+    def __init__(self, m, n, k):
+        self.m = m
+        self.n = n
+        self.k = k
+        self.full = (1 << (m * n)) - 1
+
+        # Masks of every k-cell window, and the windows through each cell
+        self.lines = []
+        for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            for i in range(m):
+                for j in range(n):
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        mask = 0
+                        for step in range(k):
+                            mask |= 1 << self.cell(i + di * step, j + dj * step)
+                        self.lines.append(mask)
+        self.cell_lines = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(m * n)
+        ]
+
+        # Masks of the cells surrounding each cell
+        self.around = []
+        for i in range(m):
+            for j in range(n):
+                mask = 0
+                for x in range(max(0, i - 1), min(m, i + 2)):
+                    for y in range(max(0, j - 1), min(n, j + 2)):
+                        mask |= 1 << self.cell(x, y)
+                self.around.append(mask)
+
+        # Cells ordered from the center outwards
+        center_i = (m - 1) / 2
+        center_j = (n - 1) / 2
+        self.order = sorted(
+            range(m * n),
+            key=lambda c: abs(c // n - center_i) + abs(c % n - center_j)
+        )
+
+        # Score for a window holding c of one player's marks and none of
+        # the other's; a win outweighs any sum of window scores
+        self.weights = [0] + [10 ** c for c in range(1, k)]
+        self.win = 10 ** (k + 1) * len(self.lines)
+        self.infinity = 2 * self.win
+
+    def cell(self, i, j):
+        return self.n * i + j
+
+    def won(self, mask, cell):
+        """
+        Returns True if mask completes a window through cell.
+        """
+        for line in self.cell_lines[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def evaluate(self, mine, theirs):
+        """
+        Scores a position from the point of view of the owner of mine.
+        """
+        score = 0
+        weights = self.weights
+        for line in self.lines:
+            if not line & theirs:
+                score += weights[bin(line & mine).count("1")]
+            elif not line & mine:
+                score -= weights[bin(line & theirs).count("1")]
+        return score
+
+    def candidates(self, occupied, exhaustive=False):
+        """
+        Returns empty cells next to an occupied cell in center-first
+        order, or the center if the board is empty. If exhaustive,
+        the other empty cells follow, so no move is left out.
+        """
+        empty = self.full & ~occupied
+        if not occupied:
+            near = 1 << self.order[0]
+        else:
+            near = 0
+            for cell in range(self.m * self.n):
+                if occupied >> cell & 1:
+                    near |= self.around[cell]
+            near &= empty
+        moves = [cell for cell in self.order if near >> cell & 1]
+        if exhaustive:
+            moves += [cell for cell in self.order
+                      if (empty & ~near) >> cell & 1]
+        return moves
+
+    def negamax(self, mine, theirs, depth, alpha, beta, deadline):
+        """
+        Returns the value of the position for the player to move, who
+        owns mine, searching depth plies. Raises Timeout past deadline.
+        """
+        if deadline is not None and time.perf_counter() > deadline:
+            raise Timeout
+        occupied = mine | theirs
+        if occupied == self.full:
+            return 0
+        if depth == 0:
+            return self.evaluate(mine, theirs)
+
+        # Only a search reaching the end of the game must try every cell
+        exhaustive = depth >= bin(self.full & ~occupied).count("1")
+        value = -self.infinity
+        for cell in self.candidates(occupied, exhaustive):
+            bit = 1 << cell
+            if self.won(mine | bit, cell):
+                # Prefer the quickest win
+                return self.win + depth
+            v = -self.negamax(theirs, mine | bit, depth - 1,
+                              -beta, -alpha, deadline)
+            if v > value:
+                value = v
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return value
+
+    def best_move(self, mine, theirs, time_limit=None):
+        """
+        Returns the best cell for the owner of mine, deepening the search
+        one ply at a time until the board is exhausted or time_limit
+        seconds have passed. Always returns a move if one exists.
+        """
+        occupied = mine | theirs
+        moves = self.candidates(occupied, True)
+        if not moves:
+            return None
+        for cell in moves:
+            if self.won(mine | 1 << cell, cell):
+                return cell
+
+        deadline = None
+        if time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        best = moves[0]
+        empty = len(moves)
+
+        for depth in range(1, empty + 1):
+            # Search the previous best move first
+            moves = self.candidates(occupied, depth >= empty)
+            if best in moves:
+                moves.remove(best)
+            moves.insert(0, best)
+            alpha = -self.infinity
+            depth_best = None
+            try:
+                for cell in moves:
+                    bit = 1 << cell
+                    v = -self.negamax(theirs, mine | bit, depth - 1,
+                                      -self.infinity, -alpha, deadline)
+                    if depth_best is None or v > alpha:
+                        alpha, depth_best = v, cell
+            except Timeout:
+                # The previous best was searched first, so a partial
+                # result at this depth is at least as well informed
+                if depth_best is not None:
+                    best = depth_best
+                break
+            best = depth_best
+        return best
+
+
+# Games by (m, n, k), built on first use
+games = {}
+
+
+def game_for(m, n, k):
+    if (m, n, k) not in games:
+        games[m, n, k] = Game(m, n, k)
+    return games[m, n, k]
+
+
+def minimax(board, k, time_limit=None):
+    """
+    Returns the best (i, j) action found for the player to move on a
+    list-of-lists board where k in a row wins, or None if there is
+    no legal move. Boards larger than 3x3 are searched for TIME_LIMIT
+    seconds if no time_limit is given.
+    """
+    m = len(board)
+    n = len(board[0])
+    if time_limit is None and m * n > 9:
+        time_limit = TIME_LIMIT
+    game = game_for(m, n, k)
+    x = o = 0
+    for i in range(m):
+        for j in range(n):
+            if board[i][j] == "X":
+                x |= 1 << game.cell(i, j)
+            elif board[i][j] == "O":
+                o |= 1 << game.cell(i, j)
+
+    if bin(x).count("1") == bin(o).count("1"):
+        cell = game.best_move(x, o, time_limit)
+    else:
+        cell = game.best_move(o, x, time_limit)
+    if cell is None:
+        return None
+    return divmod(cell, n)
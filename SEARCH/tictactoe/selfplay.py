@@ -0,0 +1,111 @@
+"""
+Headless Tic Tac Toe self-play
+
+Plays many engine-vs-engine games across worker processes and reports
+outcomes and per-move latency percentiles for each engine.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+import bitboard
+import tictactoe as ttt
+
+
+def random_engine(board, k, time_limit, rng):
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+def minimax_engine(board, k, time_limit, rng):
+    return ttt.minimax(board, k, time_limit)
+
+
+def search_engine(board, k, time_limit, rng):
+    # Exact 3x3 search without the opening book
+    return bitboard.minimax(board)
+
+
+ENGINES = {
+    "random": random_engine,
+    "minimax": minimax_engine,
+    "search": search_engine
+}
+
+
+def play(args):
+    """
+    Plays one game and returns its winner (or None for a tie)
+    and the latencies in seconds of each side's moves.
+    """
+    seed, x_engine, o_engine, m, n, k, time_limit = args
+    rng = random.Random(seed)
+    engines = {ttt.X: ENGINES[x_engine], ttt.O: ENGINES[o_engine]}
+    latencies = {ttt.X: [], ttt.O: []}
+
+    board = ttt.initial_state(m, n)
+    while not ttt.terminal(board, k):
+        player = ttt.player(board)
+        start = time.perf_counter()
+        move = engines[player](board, k, time_limit, rng)
+        latencies[player].append(time.perf_counter() - start)
+        board = ttt.result(board, move)
+    return ttt.winner(board, k), latencies
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of values by the nearest-rank method.
+    """
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[int(rank)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--x", choices=ENGINES, default="minimax")
+    parser.add_argument("--o", choices=ENGINES, default="random")
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("M", "N", "K"))
+    parser.add_argument("--time-limit", type=float,
+                        help="seconds per move for the minimax engine "
+                        "(default: exact on 3x3, mnk.TIME_LIMIT otherwise)")
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    m, n, k = args.size
+    if "search" in (args.x, args.o) and args.size != [3, 3, 3]:
+        parser.error("the search engine only plays 3x3")
+
+    games = [(args.seed + i, args.x, args.o, m, n, k, args.time_limit)
+             for i in range(args.games)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        chunksize = max(1, len(games) // (4 * args.workers))
+        results = pool.map(play, games, chunksize)
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(winner for winner, _ in results)
+    print(f"{len(results)} games of {args.x} (X) vs {args.o} (O) "
+          f"on {m}x{n}, {k} in a row, in {elapsed:.2f}s")
+    print(f"    X wins: {outcomes[ttt.X]}  "
+          f"O wins: {outcomes[ttt.O]}  ties: {outcomes[None]}")
+
+    for side, engine in [(ttt.X, args.x), (ttt.O, args.o)]:
+        latencies = [t for _, moves in results for t in moves[side]]
+        if not latencies:
+            continue
+        cells = "  ".join(
+            f"p{p}: {1000 * percentile(latencies, p):.3f}ms"
+            for p in (50, 95, 99, 100)
+        )
+        print(f"    {side} ({engine}) {len(latencies)} moves  {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,53 +2,47 @@
 Tic Tac Toe Player
 """
 from abc import abstractproperty
-import math, copy
+import math, json
+import bitboard
+import book
+import mnk
 X = "X"
 O = "O"
 EMPTY = None
 
+# Transposition table shared with the bitboard engine:
+# maps encoded boards to their (value, move, flag)
+table = bitboard.table
 
-def initial_state():
+
+def initial_state(m=3, n=3):
     """
-    Returns starting state of the board.
+    Returns starting state of an m x n board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * n for _ in range(m)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    i = 0
     x_counter = 0
     o_counter = 0
-    while i < 3:
-        j = 0
-        while j < 3:
-            if board[i][j] == X:
-                x_counter += 1
-                j += 1
-            elif board[i][j] == O:
-                o_counter += 1
-                j += 1
-            else:
-                j += 1
-        i += 1
+    for row in board:
+        x_counter += row.count(X)
+        o_counter += row.count(O)
     return O if x_counter > o_counter else X
 
 
 def actions(board):
-    i = 0
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
     actions = set()
-    while i < 3:
-        j = 0
-        while j < 3:
-            if board[i][j] == None:
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == EMPTY:
                 actions.add((i, j))
-            j += 1
-        i += 1
     return actions
 
 
@@ -56,72 +50,55 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    possible_actions = actions(board)
-    board_copy = copy.deepcopy(board)
-    if action not in possible_actions:
-        print(action, possible_actions)
-        raise ValueError
-    else:
-        board_copy[action[0]][action[1]] = player(board)
-        return board_copy
-
-
-def winner(board):
-    """
-    Returns the winner of the game, if there is one.
-    """
-    # Check vertically
-    for i in range(3):
-        if board[i][0] == board[i][1] == board[i][2]:
-            if board[i][0] == X:
-                return X
-            elif board[i][0] == O:
-                return O
-            else:
-                return None
-    # Check orizontally
-    for j in range(3):
-        if board[0][j] == board[1][j] == board[2][j]:
-            if board[0][j] == X:
-                return X
-            elif board[0][j] == O:
-                return O
-            else:
-                return None
-    # Check diagonally
-    if board[0][0] == board[1][1] == board[2][2]:
-        if board[0][0] == X:
-            return X
-        elif board[0][0] == O:
-            return O
-        else:
-            return None
-    if board[2][0] == board[1][1] == board[0][2]:
-        if board[2][0] == X:
-            return X
-        elif board[2][0] == O:
-            return O
-        else:
-            return None
+    i, j = action
+    if not (0 <= i < len(board) and 0 <= j < len(board[0])) \
+            or board[i][j] != EMPTY:
+        raise ValueError(f"invalid action {action}")
+    board_copy = [row[:] for row in board]
+    board_copy[i][j] = player(board)
+    return board_copy
+
+
+def winner(board, k=3):
+    """
+    Returns the winner of the game, if there is one,
+    where k marks in a row win.
+    """
+    m = len(board)
+    n = len(board[0])
+    for i in range(m):
+        for j in range(n):
+            mark = board[i][j]
+            if mark == EMPTY:
+                continue
+            # Check horizontally, vertically and both diagonals
+            for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                end_i = i + di * (k - 1)
+                end_j = j + dj * (k - 1)
+                if not (0 <= end_i < m and 0 <= end_j < n):
+                    continue
+                if all(board[i + di * step][j + dj * step] == mark
+                       for step in range(1, k)):
+                    return mark
     return None
 
 
-def terminal(board):
+def terminal(board, k=3):
     """
     Returns True if game is over, False otherwise.
     """
-    if len(actions(board)) == 0 or winner(board) != None:
+    if len(actions(board)) == 0 or winner(board, k) != None:
         return True
     else:
         return False
 
 
-def utility(board):
+def utility(board, k=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if terminal(board):
-        result = winner(board)
+    if terminal(board, k):
+        result = winner(board, k)
         if result == X:
             return 1
         elif result == O:
@@ -130,47 +107,47 @@ def utility(board):
             return 0 
 
 
-def minimax(board):
+def minimax(board, k=3, time_limit=None):
     """
     Returns the optimal action for the current player on the board.
+
+    The standard 3x3 game is answered from the opening book, or
+    solved exactly if the book is missing. Other board sizes and
+    line lengths, or any call with a time_limit in seconds, use
+    iterative deepening and return the best move found in time.
+    Larger boards default to mnk.TIME_LIMIT seconds per move.
     """
-    if terminal(board):
+    if terminal(board, k):
         return None
-    else:
-        if player(board) == X:
-            print(max_value(board))
-            return max_value(board)[1]
-        elif player(board) == O:
-            print(min_value(board))
-            return min_value(board)[1]
-
-
-def max_value(board):
-    if terminal(board):
-        return utility(board), None
-    v = float("-inf")
-    move = None  
-    for action in actions(board):
-        check_value, dummy = min_value(result(board, action))
-        if check_value > v:
-            v = check_value
-            move = action
-            if v == 1:
-                return v, move
-    return v, move
-
-
-def min_value(board):
-    if terminal(board):
-        return utility(board), None
-        
-    v = float("inf")
-    move = None       
-    for action in actions(board):
-        check_value, dummy = max_value(result(board, action))
-        if check_value < v:
-            v = check_value
-            move = action
-            if v == -1:
-                return v, move
-    return v, move
\ No newline at end of file
+    if len(board) == 3 and len(board[0]) == 3 and k == 3:
+        move = book.lookup(board)
+        if move is not None:
+            return move
+        if time_limit is None:
+            return bitboard.minimax(board)
+    return mnk.minimax(board, k, time_limit)
+
+
+def encode(board):
+    """
+    Returns the bitboard engine's integer key for the board.
+    """
+    return bitboard.key(*bitboard.from_board(board))
+
+
+def load_table(path):
+    """
+    Loads solved positions saved by save_table into the table.
+    """
+    with open(path) as f:
+        for key, (value, move, flag) in json.load(f).items():
+            move = tuple(move) if move is not None else None
+            table[int(key)] = (value, move, flag)
+
+
+def save_table(path):
+    """
+    Saves every solved position in the table to a JSON file.
+    """
+    with open(path, "w") as f:
+        json.dump(table, f)